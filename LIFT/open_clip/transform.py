@@ -8,6 +8,7 @@ import torch
 import torchvision.transforms.functional as F
 from torchvision.transforms import Normalize, Compose, RandomResizedCrop, InterpolationMode, ToTensor, Resize, \
     CenterCrop, ColorJitter, Grayscale, Lambda
+from torchvision.transforms import v2
 
 from .constants import OPENAI_DATASET_MEAN, OPENAI_DATASET_STD
 from .utils import to_2tuple
@@ -447,6 +448,57 @@ def image_transform_gpu_wrapper(image_size, mean, std, resize_mode, interpolatio
 
 
 
+def image_transform_batched_wrapper(image_size, mean, std, aug_cfg):
+    """Wrapper for image_transform_batched, which returns a callable waiting for the device
+    and dtype arguments (mirroring image_transform_gpu_wrapper). The instantiated transform
+    takes the whole batch of PIL images at once: the random crop runs per sample on cheap
+    uint8 tensors, while the float conversion and normalize run vectorized over the stacked
+    batch with torchvision transforms.v2, instead of per sample in a Python loop.
+    """
+    def image_transform_batched(device, input_dtype):
+        nonlocal image_size, mean, std, aug_cfg
+
+        mean = mean or OPENAI_DATASET_MEAN
+        if not isinstance(mean, (list, tuple)):
+            mean = (mean,) * 3
+        std = std or OPENAI_DATASET_STD
+        if not isinstance(std, (list, tuple)):
+            std = (std,) * 3
+
+        if isinstance(aug_cfg, dict):
+            aug_cfg = AugmentationCfg(**aug_cfg)
+        else:
+            aug_cfg = aug_cfg or AugmentationCfg()
+        aug_cfg_dict = {k: v for k, v in asdict(aug_cfg).items() if v is not None}
+
+        crop = v2.RandomResizedCrop(
+            image_size,
+            scale=aug_cfg_dict.pop('scale'),
+            interpolation=InterpolationMode.BICUBIC,
+            antialias=True,
+        )
+        batch_transform = v2.Compose([
+            v2.ToDtype(torch.float32, scale=True),
+            v2.Normalize(mean=mean, std=std, inplace=True), # reuse the float batch from ToDtype
+        ])
+        out_h, out_w = to_2tuple(image_size)
+
+        def transform_batch(pil_images):
+            # write each crop straight into its row of a preallocated batch buffer; stacking
+            # a list would keep all per-sample crops alive at once and copy them a second
+            # time, doubling the peak memory of the uint8 stage
+            images = torch.empty((len(pil_images), 3, out_h, out_w), dtype=torch.uint8)
+            for i, img in enumerate(pil_images):
+                images[i].copy_(crop(v2.functional.pil_to_tensor(img)))
+            images = batch_transform(images)
+            return images.to(device=device, dtype=input_dtype)
+
+        return transform_batch
+    # return a callable to be used during training
+    return image_transform_batched
+
+
+
 def image_transform_v2(
         cfg: PreprocessCfg,
         is_train: bool,
@@ -470,14 +522,13 @@ def image_transform_v3(
         is_train: bool,
         aug_cfg: Optional[Union[Dict[str, Any], AugmentationCfg]] = None,
 ):
-    """A simplified version of image_transform_v2 with essential features for CLIP and LIFT,
-    The preprocess is now optimized for GPU execution. It is now done after data is loaded.
+    """A simplified version of image_transform_v2 with essential features for CLIP and LIFT.
+    The preprocess runs batched inside the dataloader workers: per-sample uint8 crops plus a
+    single vectorized convert + normalize over the stacked batch.
     """
-    return image_transform_gpu_wrapper(
+    return image_transform_batched_wrapper(
         image_size=cfg.size,
         mean=cfg.mean,
         std=cfg.std,
-        interpolation=cfg.interpolation,
-        resize_mode=cfg.resize_mode,
         aug_cfg=aug_cfg,
     )
@@ -1,6 +1,7 @@
 import webdataset as wds
 import math
 import os
+import torch
 from .data_loader_tar import get_imagenet
 
 from .data_utils import (
@@ -19,7 +20,9 @@ from .data_utils import (
     SimpleShardList,
     worker_init_fn_wrapper,
     simple_zip_collation_fn,
-    pytorch_simple_collation_fn
+    pytorch_simple_collation_fn,
+    train_collation_fn_wrapper,
+    load_text_embed_table
 )
 
 
@@ -90,8 +93,8 @@ def get_raw_text_dataset(args, available_cpus, epoch=0, floor=False):
 
 
 
-def get_clip_train_dataset(args, available_cpus, epoch=0, floor=False):
-    """Return the dataloader for CLIP's training; output both raw captions and images.
+def get_clip_train_dataset(args, available_cpus, preprocess_img, tokenizer, epoch=0, floor=False):
+    """Return the dataloader for CLIP's training; output preprocessed images and tokenized captions.
     Dataset structure:
         /train_data (the image folder)
             /train-XXXX-of-XXXX
@@ -108,6 +111,9 @@ def get_clip_train_dataset(args, available_cpus, epoch=0, floor=False):
     num_parqs = len(os.listdir(args.raw_text_data))
     num_samples = args.train_num_samples
 
+    # instantiate the train transform for CPU execution; it runs inside the dataloader workers
+    preprocess = preprocess_img(torch.device('cpu'), torch.float32)
+
     shared_epoch = SharedEpoch(epoch=epoch)  # create a shared epoch store to sync epoch to dataloader worker proc
     pipeline = [SimpleShardList(input_parqs)]
 
@@ -135,7 +141,7 @@ def get_clip_train_dataset(args, available_cpus, epoch=0, floor=False):
         wds.decode("pilrgb", handler=log_and_continue),
         wds.rename(text="__txt__", image="jpg;png;jpeg;webp"),
         wds.to_tuple("image", "text"),
-        wds.batched(args.batch_size, collation_fn=simple_zip_collation_fn, partial=False)
+        wds.batched(args.batch_size, collation_fn=train_collation_fn_wrapper(preprocess, tokenizer, args.text_embed_dim), partial=False)
     ])
 
     dataset = wds.DataPipeline(*pipeline)
@@ -157,6 +163,8 @@ def get_clip_train_dataset(args, available_cpus, epoch=0, floor=False):
         shuffle=False,
         num_workers=args.workers,
         persistent_workers=args.workers > 0,
+        prefetch_factor=4 if args.workers > 0 else None,
+        pin_memory=True,
         worker_init_fn=worker_init_fn_wrapper(available_cpus),
         collate_fn=pytorch_simple_collation_fn,
     )
@@ -169,8 +177,8 @@ def get_clip_train_dataset(args, available_cpus, epoch=0, floor=False):
 
 
 
-def get_lift_train_dataset(args, available_cpus, epoch=0, floor=False):
-    """Return the dataloader for LIFT's training; output both caption embeddings and images.
+def get_lift_train_dataset(args, available_cpus, preprocess_img, tokenizer, epoch=0, floor=False):
+    """Return the dataloader for LIFT's training; output preprocessed images and caption embeddings.
     Dataset structure:
         /train_data (the image folder)
             /train-XXXX-of-XXXX
@@ -190,6 +198,15 @@ def get_lift_train_dataset(args, available_cpus, epoch=0, floor=False):
     num_dirs = len(os.listdir(args.embedded_text_data))
     num_samples = args.train_num_samples
 
+    # instantiate the train transform for CPU execution; it runs inside the dataloader workers
+    preprocess = preprocess_img(torch.device('cpu'), torch.float32)
+
+    # optionally preload the whole embedding table once; batches then carry row indices and
+    # the per-step embedding H2D copy disappears (the table is moved to GPU by the train loop)
+    text_embed_table = embed_index = None
+    if args.preload_text_embeds:
+        text_embed_table, embed_index = load_text_embed_table(args.embedded_text_data)
+
     shared_epoch = SharedEpoch(epoch=epoch)  # create a shared epoch store to sync epoch to dataloader worker proc
     pipeline = [SimpleShardList(input_dirs)]
 
@@ -206,7 +223,7 @@ def get_lift_train_dataset(args, available_cpus, epoch=0, floor=False):
     ])
     pipeline.extend([
         # at this point, we have an iterator over the shards assigned to each worker at each node
-        dir_to_samples_nothrow_wrapper(image_root=args.train_data, fetch=True),
+        dir_to_samples_nothrow_wrapper(image_root=args.train_data, fetch=True, embed_index=embed_index),
         wds.shuffle(
             bufsize=_SAMPLE_SHUFFLE_SIZE,
             initial=_SAMPLE_SHUFFLE_INITIAL,
@@ -215,10 +232,10 @@ def get_lift_train_dataset(args, available_cpus, epoch=0, floor=False):
 
     pipeline.extend([
         wds.decode("pilrgb", handler=log_and_continue),
-        wds.rename(image="jpg;png;jpeg;webp", embedding="__embedding__",), 
+        wds.rename(image="jpg;png;jpeg;webp", embedding="__embedding__",),
         wds.to_tuple("image", "embedding"),
         wds.select(filter_nan_value),
-        wds.batched(args.batch_size, collation_fn=simple_zip_collation_fn, partial=False)
+        wds.batched(args.batch_size, collation_fn=train_collation_fn_wrapper(preprocess, tokenizer, args.text_embed_dim), partial=False)
     ])
 
     dataset = wds.DataPipeline(*pipeline)
@@ -240,6 +257,8 @@ def get_lift_train_dataset(args, available_cpus, epoch=0, floor=False):
         shuffle=False,
         num_workers=args.workers,
         persistent_workers=args.workers > 0,
+        prefetch_factor=4 if args.workers > 0 else None,
+        pin_memory=True,
         worker_init_fn=worker_init_fn_wrapper(available_cpus),
         collate_fn=pytorch_simple_collation_fn,
     )
@@ -248,22 +267,23 @@ def get_lift_train_dataset(args, available_cpus, epoch=0, floor=False):
     dataloader.num_batches = num_batches
     dataloader.num_samples = num_samples
 
-    return DataInfo(dataloader=dataloader, shared_epoch=shared_epoch)
+    return DataInfo(dataloader=dataloader, shared_epoch=shared_epoch, text_embed_table=text_embed_table)
 
 
 
-def get_data(args, available_cpus, preprocess_fns=None, epoch=0):
+def get_data(args, available_cpus, preprocess_fns=None, epoch=0, tokenizer=None):
     data = {}
 
     if "llm_model" in args:
         # text embeddings offline generation
         data["raw_text"] = get_raw_text_dataset(args, available_cpus, epoch=epoch)
     else:
+        preprocess_train, _ = preprocess_fns
         if args.text_embed_dim:
             # LIFT
-            data["train"] = get_lift_train_dataset(args, available_cpus, epoch=epoch)
+            data["train"] = get_lift_train_dataset(args, available_cpus, preprocess_train, tokenizer, epoch=epoch)
         else:
             # CLIP
-            data["train"] = get_clip_train_dataset(args, available_cpus, epoch=epoch)
+            data["train"] = get_clip_train_dataset(args, available_cpus, preprocess_train, tokenizer, epoch=epoch)
 
     return data
\ No newline at end of file
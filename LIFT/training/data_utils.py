@@ -11,7 +11,7 @@ import time
 import subprocess
 from dataclasses import dataclass
 from multiprocessing import Value
-from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Set, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, NamedTuple, Optional, Set, Tuple
 
 import numpy as np
 import pandas as pd
@@ -71,6 +71,7 @@ class DataInfo:
     dataloader: DataLoader
     sampler: DistributedSampler = None
     shared_epoch: SharedEpoch = None
+    text_embed_table: torch.Tensor = None # full caption-embedding table when preloaded (LIFT)
 
     def set_epoch(self, epoch):
         if self.shared_epoch is not None:
@@ -200,18 +201,20 @@ def parquet_content_iter(data, image_root=None, fetch=False, recaptioned=True) -
 
 
 
-def dir_to_samples_nothrow_wrapper(image_root=None, fetch=False):
+def dir_to_samples_nothrow_wrapper(image_root=None, fetch=False, embed_index=None):
     """Return an iterator that yields samples from the caption embedding and the image folders.
         This iterator is used for LIFT's training.
-        
+
         Key args:
             image_root: path to the image folder
             fetch: whether to fetch images or not; true for LIFT's training
+            embed_index: optional filename -> row mapping of a preloaded embedding table; when
+                given, samples carry the row index instead of the embedding itself
             src: the returned value of the iterator SimpleShardList, a dict containing the path to the folders that contain number-indexed small parquet files.
     """
     def dir_to_samples_nothrow(src):
         dir = dirs_opener(src)
-        samples = dir_content_iter(dir, image_root=image_root, fetch=fetch)
+        samples = dir_content_iter(dir, image_root=image_root, fetch=fetch, embed_index=embed_index)
         return samples
     return dir_to_samples_nothrow
 
@@ -223,7 +226,7 @@ def dirs_opener(src) -> Iterator[Dict[str, Any]]:
 
 
 
-def dir_content_iter(data, image_root=None, fetch=False) -> Iterator[Dict[str, Any]]:
+def dir_content_iter(data, image_root=None, fetch=False, embed_index=None) -> Iterator[Dict[str, Any]]:
     for dir in data:
         for parquet in os.listdir(dir):
             parquet = os.path.join(dir, parquet)
@@ -239,10 +242,16 @@ def dir_content_iter(data, image_root=None, fetch=False) -> Iterator[Dict[str, A
                 for _, row in df.iterrows():
                     key = row['key']
                     ext = key.split(".")[-1]
-                    embedding = row['embedding']
+                    fname = key.split(".")[0] # get rid of extension
+                    if embed_index is not None:
+                        if fname not in embed_index:
+                            continue # NaN embeddings are dropped at table-build time
+                        embedding = np.int64(embed_index[fname])
+                    else:
+                        embedding = row['embedding']
 
                     out = {
-                        '__fname__': key.split(".")[0], # get rid of extension
+                        '__fname__': fname,
                         '__embedding__': embedding,
                     }
                     if fetch:
@@ -262,6 +271,43 @@ def dir_content_iter(data, image_root=None, fetch=False) -> Iterator[Dict[str, A
 
 
 
+def load_text_embed_table(embedded_text_data):
+    """Scan the caption-embedding parquet tree once and build the preloaded table.
+
+    Returns (table, index): a single float32 tensor with one caption embedding per row, and a
+    filename -> row mapping used by the dataloader to emit integer indices instead of the
+    embeddings themselves. NaN embeddings are skipped here, mirroring filter_nan_value.
+    Only use this when the full table fits in (GPU) memory.
+    """
+    embeddings = []
+    index = {}
+    for dir in sorted(os.listdir(embedded_text_data)):
+        dir = os.path.join(embedded_text_data, dir)
+        for parquet in sorted(os.listdir(dir)):
+            parquet = os.path.join(dir, parquet)
+
+            try:
+                parquet_file = pq.ParquetFile(parquet)
+            except Exception as e:
+                logging.info(f"Cannot open {parquet}. {e}")
+                continue
+
+            for batch in parquet_file.iter_batches(batch_size=1024, columns=['key', 'embedding']):
+                df = batch.to_pandas()
+                for key, embedding in zip(df['key'], df['embedding']):
+                    if np.isnan(embedding).any():
+                        continue
+                    index[key.split(".")[0]] = len(embeddings)
+                    embeddings.append(embedding)
+                del df, batch
+            del parquet_file
+
+    table = torch.from_numpy(np.stack(embeddings, axis=0))
+    logging.info(f'Preloaded text-embedding table: {tuple(table.shape)} ({table.nbytes / 2**30:.2f} GiB).')
+    return table, index
+
+
+
 def pytorch_worker_seed(increment=0):
     """get dataloader worker seed from pytorch"""
     worker_info = get_worker_info()
@@ -355,6 +401,46 @@ def simple_zip_collation_fn(samples):
 
 
 
+class TrainBatch(NamedTuple):
+    """A preprocessed training batch. Defining pin_memory() lets the pytorch pin-memory
+    thread pin this custom batch type in page-locked host memory, which in turn allows
+    the training loop to issue non-blocking (async DMA) host-to-device copies."""
+    images: torch.Tensor
+    texts: torch.Tensor
+
+    def pin_memory(self):
+        return TrainBatch(self.images.pin_memory(), self.texts.pin_memory())
+
+
+
+def train_collation_fn_wrapper(preprocess, tokenizer, text_embed_dim):
+    """Create a batch collation function that preprocesses images inside the CPU dataloader
+    workers and returns stacked tensors, so the main process only pays for a single
+    non-blocking H2D copy per batch instead of a per-sample preprocess loop.
+
+    Key args:
+        preprocess: the preprocess function for images, instantiated for CPU execution
+        tokenizer: the tokenizer for texts, only for CLIP
+        text_embed_dim: the caption embedding dimension; set for LIFT, None for CLIP
+    """
+    def train_collation_fn(samples):
+        assert isinstance(samples[0], (list, tuple)), type(samples[0])
+        tuple_images, tuple_texts = zip(*samples)
+
+        # batched transform: per-sample uint8 crops, then one vectorized convert + normalize
+        images = preprocess(tuple_images)
+
+        if not text_embed_dim: # CLIP
+            texts = tokenizer(list(tuple_texts))
+        else: # LIFT
+            # one contiguous allocation + memcpy instead of N small tensors that stack copies again
+            texts = torch.from_numpy(np.stack(tuple_texts, axis=0))
+
+        return TrainBatch(images=images, texts=texts)
+    return train_collation_fn
+
+
+
 def pytorch_simple_collation_fn(batch):
     return batch
 
@@ -74,6 +74,13 @@ def parse_args(args, extra_arguments_parser=None):
         default=None,
         help="The special notes to distinguish runs, ususally some special experimental features",
     )
+    parser.add_argument(
+        "--preload-text-embeds",
+        default=False,
+        action="store_true",
+        help="Preload the whole caption-embedding table to GPU once and let the dataloader emit row indices, "
+        "removing the per-step embedding H2D copy. Only feasible when the table fits in GPU memory.",
+    )
     parser.add_argument(
         "--simplistic-cos",
         type=bool,
@@ -268,9 +275,9 @@ def parse_args(args, extra_arguments_parser=None):
     )
     parser.add_argument(
         "--precision",
-        choices=["amp", "amp_bf16", "amp_bfloat16", "bf16", "fp16", "pure_bf16", "pure_fp16", "fp32"],
+        choices=["amp", "amp_bf16", "amp_bfloat16", "bf16", "fp16", "pure_bf16", "pure_fp16", "fp32", "fp8"],
         default="amp",
-        help="Floating point precision."
+        help="Floating point precision. fp8 runs encoder linears through Transformer Engine under bf16 autocast (H100 or newer)."
     )
     parser.add_argument(
         "--model",
@@ -532,6 +539,13 @@ def parse_args(args, extra_arguments_parser=None):
         help='Replace the network linear layers from the bitsandbytes library. '
         'Allows int8 training/inference, etc.'
     )
+    parser.add_argument(
+        "--cuda-graph",
+        default=False,
+        action="store_true",
+        help="Capture forward+backward in a CUDA Graph and replay it each step. "
+        "Requires fixed batch shapes; only takes effect with accum_freq == 1, no distillation and no grad scaler.",
+    )
     parser.add_argument(
         "--siglip",
         default=False,
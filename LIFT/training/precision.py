@@ -5,8 +5,10 @@ from contextlib import suppress
 def get_autocast(precision):
     if precision == 'amp':
         return torch.amp.autocast
-    elif precision == 'amp_bfloat16' or precision == 'amp_bf16':
+    elif precision in ('amp_bfloat16', 'amp_bf16', 'fp8'):
         # amp_bfloat16 is more stable than amp float16 for clip training
+        # fp8 keeps non-linear ops (and the loss) in bf16/fp32; only the Transformer Engine
+        # linears run in fp8 inside their own fp8_autocast region
         return lambda: torch.amp.autocast(dtype=torch.bfloat16, device_type='cuda')
     else:
         return suppress
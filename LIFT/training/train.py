@@ -2,6 +2,9 @@ import logging
 import math
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext, suppress
+
 import torch
 
 try:
@@ -9,6 +12,12 @@ try:
 except ImportError:
     wandb = None
 
+try:
+    import transformer_engine.pytorch as te
+    from transformer_engine.common.recipe import DelayedScaling
+except ImportError:
+    te = None
+
 from open_clip import get_input_dtype
 from .distributed import is_master
 from .precision import get_autocast
@@ -16,14 +25,14 @@ from .precision import get_autocast
 
 
 class AverageMeter(object):
-    """Computes and stores the average and current value"""
+    """Computes and stores the average and current value.
+    The average is computed lazily on read since it is only consumed on log steps."""
 
     def __init__(self):
         self.reset()
 
     def reset(self):
         self.val = 0
-        self.avg = 0
         self.sum = 0
         self.count = 0
 
@@ -31,7 +40,10 @@ class AverageMeter(object):
         self.val = val
         self.sum += val * n
         self.count += n
-        self.avg = self.sum / self.count
+
+    @property
+    def avg(self):
+        return self.sum / self.count
 
 
 
@@ -51,32 +63,184 @@ def backward(total_loss, scaler):
 
 
 
-def during_training_data_preprocess(tuple_images, tuple_texts, preprocess, args, tokenizer, device):
-    """In our hardware setting, do the preprocessing in the training loop on GPU is faster than doing it in the dataloader on CPU. 
-    Thus the dataloader only returns raw images and texts as tuples, and we do the preprocessing here.
+def sum_losses(losses):
+    # reduce all loss terms with a single stacked kernel instead of a chain of
+    # pairwise adds between scalar tensors
+    loss_values = list(losses.values())
+    if len(loss_values) == 1:
+        return loss_values[0]
+    return torch.stack(loss_values).sum()
+
+
+
+def during_training_data_preprocess(batch, device, input_dtype):
+    """Preprocessing (image transforms, tokenization / embedding stacking) runs inside the
+    dataloader workers on CPU (see data_utils.train_collation_fn_wrapper), and batches arrive
+    already pinned in host memory. Here we only issue non-blocking H2D copies, so the DMA
+    transfer overlaps with the previous step's forward/backward.
 
     Key Args:
-        tuple_texts: a tuple of texts, either str (CLIP) or numpy array (LIFT)
-        preprocess: the preprocess function for images
-        tokenizer: the tokenizer for texts, only for CLIP
+        batch: a TrainBatch of stacked (images, texts) CPU tensors
+        input_dtype: the image dtype for the current precision; None under amp autocast
     """
-    images = []
-    for img in tuple_images:
-        images.append(preprocess(img))
-    images = torch.stack(images, dim=0)
-    del tuple_images
-    
-    if not args.text_embed_dim: # CLIP
-        texts = tokenizer(list(tuple_texts))
-    else: # LIFT
-        texts = torch.stack([torch.from_numpy(text) for text in tuple_texts], dim=0)
+    images, texts = batch
+    images = images.to(device=device, dtype=input_dtype, non_blocking=True)
     texts = texts.to(device=device, non_blocking=True) # text embedding in float32
-    del tuple_texts
-
     return images, texts
 
 
 
+class CUDAPrefetcher:
+    """Wrap the train dataloader and issue the next batch's H2D copies on a dedicated side
+    CUDA stream while the main stream is still running the current step's forward/backward,
+    following the NVIDIA Apex imagenet prefetcher pattern. This hides the PCIe transfer
+    latency behind compute instead of serializing load -> copy -> forward."""
+
+    def __init__(self, dataloader, device, input_dtype):
+        self.dataloader = dataloader
+        self.device = device
+        self.input_dtype = input_dtype
+        self.stream = torch.cuda.Stream()
+
+    def _preload(self, loader_iter):
+        try:
+            batch = next(loader_iter)
+        except StopIteration:
+            return None
+        with torch.cuda.stream(self.stream):
+            return during_training_data_preprocess(batch, self.device, self.input_dtype)
+
+    def __iter__(self):
+        loader_iter = iter(self.dataloader)
+        prefetched = self._preload(loader_iter)
+        current_stream = torch.cuda.current_stream()
+        while prefetched is not None:
+            current_stream.wait_stream(self.stream)
+            images, texts = prefetched
+            # keep the caching allocator from recycling these blocks while the main stream still uses them
+            images.record_stream(current_stream)
+            texts.record_stream(current_stream)
+            prefetched = self._preload(loader_iter)
+            yield images, texts
+
+
+
+class AsyncCheckpointSaver:
+    """Write step checkpoints from a background thread. The training loop only pays for
+    non-blocking D2H copies of the state into reusable pinned host buffers; serialization,
+    disk I/O and deleting the previous checkpoint happen off the critical path."""
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._buffers = {}
+        self._future = None
+
+    def _snapshot(self, name, state):
+        """Recursively copy the tensors of a (nested) state dict into cached pinned CPU buffers."""
+        if isinstance(state, torch.Tensor):
+            buf = self._buffers.get(name)
+            if buf is None:
+                buf = self._buffers[name] = torch.empty_like(state, device='cpu', pin_memory=state.is_cuda)
+            buf.copy_(state, non_blocking=True)
+            return buf
+        if isinstance(state, dict):
+            return {key: self._snapshot(f"{name}.{key}", val) for key, val in state.items()}
+        if isinstance(state, (list, tuple)):
+            return type(state)(self._snapshot(f"{name}.{idx}", val) for idx, val in enumerate(state))
+        return state
+
+    def save(self, checkpoint_dict, path, delete_path=None):
+        # don't overwrite the pinned buffers while a previous save is still reading them
+        if self._future is not None:
+            self._future.result()
+        snapshot = self._snapshot("ckpt", checkpoint_dict)
+        copies_done = torch.cuda.Event() if torch.cuda.is_available() else None
+        if copies_done is not None:
+            copies_done.record()
+
+        def _write():
+            # log failures here as well: save() re-raises them on the next call, but the
+            # last checkpoint of a run has no next call and would otherwise fail silently
+            try:
+                if copies_done is not None:
+                    copies_done.synchronize() # wait for the async D2H copies to land
+                torch.save(snapshot, path)
+                if delete_path is not None and os.path.exists(delete_path):
+                    os.remove(delete_path)
+            except Exception:
+                logging.error(f"Async checkpoint write to {path} failed.", exc_info=True)
+                raise
+
+        self._future = self._executor.submit(_write)
+
+_ckpt_saver = AsyncCheckpointSaver() # module-level so pinned buffers persist across epochs
+
+
+
+class CUDAGraphStep:
+    """Capture the forward + backward of a fixed-shape training step in a CUDA Graph and
+    replay it each iteration: one cudaGraphLaunch replaces the full per-step kernel launch
+    stream. The optimizer step, gradient clipping, scheduler and logit_scale clamp stay
+    eager so the LR schedule keeps working. Gradients live in the graph's memory pool and
+    must stay allocated between replays, so the caller has to zero them with
+    set_to_none=False."""
+
+    def __init__(self, model, loss, autocast, fp8_forward, warmup=3):
+        self.model = model
+        self.loss = loss
+        self.autocast = autocast
+        self.fp8_forward = fp8_forward
+        self.warmup = warmup
+        self.warmup_stream = torch.cuda.Stream()
+        self.graph = None
+        self.static_images = None
+        self.static_texts = None
+        self.static_losses = None
+        self.static_logit_scale = None
+
+    def _forward_backward(self, images, texts):
+        with self.autocast():
+            with self.fp8_forward():
+                model_out = self.model(images, text=texts)
+            losses = self.loss(**model_out, output_dict=True)
+            total_loss = sum_losses(losses)
+            losses["loss"] = total_loss
+        total_loss.backward()
+        logit_scale = model_out["logit_scale"] if 'logit_scale' in model_out else None
+        return losses, logit_scale
+
+    def step(self, images, texts, optimizer):
+        if self.warmup > 0:
+            # warm up eagerly on a side stream, as required before graph capture
+            self.warmup -= 1
+            self.warmup_stream.wait_stream(torch.cuda.current_stream())
+            with torch.cuda.stream(self.warmup_stream):
+                losses, logit_scale = self._forward_backward(images, texts)
+            torch.cuda.current_stream().wait_stream(self.warmup_stream)
+            return losses, logit_scale
+
+        if self.graph is None:
+            self.static_images = images.clone()
+            self.static_texts = texts.clone()
+            # free the warmup grads so backward re-allocates them inside the graph pool,
+            # where they persist as the static grad buffers replays accumulate into
+            optimizer.zero_grad(set_to_none=True)
+            self.graph = torch.cuda.CUDAGraph()
+            # thread_local: the DataLoader pin-memory thread keeps issuing CUDA host allocs
+            # during capture, and under the default global mode those would invalidate it
+            with torch.cuda.graph(self.graph, capture_error_mode="thread_local"):
+                self.static_losses, self.static_logit_scale = self._forward_backward(self.static_images, self.static_texts)
+            # capture only records the work; replay it to actually train on this batch
+            self.graph.replay()
+            return self.static_losses, self.static_logit_scale
+
+        self.static_images.copy_(images, non_blocking=True)
+        self.static_texts.copy_(texts, non_blocking=True)
+        self.graph.replay()
+        return self.static_losses, self.static_logit_scale
+
+
+
 def train_one_epoch(
         model, 
         data, 
@@ -84,82 +248,174 @@ def train_one_epoch(
         epoch,
         optimizer, 
         scaler, 
-        scheduler, 
-        dist_model, 
-        preprocess_img,
-        tokenizer,
-        args, 
+        scheduler,
+        dist_model,
+        args,
         tb_writer=None,
     ):
     device = torch.device(args.device)
     autocast = get_autocast(args.precision)
     input_dtype = get_input_dtype(args.precision) # if use amp mixed precision, input_dtype is None and autocast will handle everything
-    preprocess = preprocess_img(device, input_dtype) # instantiate the image preprocess function with device and input_dtype
+
+    if args.precision == "fp8":
+        # fp8_autocast wraps only the model forward; the loss stays in bf16/fp32 autocast
+        assert te is not None, 'Please install transformer_engine for fp8 training.'
+        fp8_recipe = DelayedScaling()
+        fp8_forward = lambda: te.fp8_autocast(enabled=True, fp8_recipe=fp8_recipe)
+    else:
+        fp8_forward = suppress
 
     model.train()
+    dist_stream = None
     if args.distill:
         dist_model.eval()
+        if device.type == 'cuda':
+            # the teacher runs on its own stream so it can overlap with the student forward
+            dist_stream = torch.cuda.Stream()
 
     data['train'].set_epoch(epoch)  # set epoch in process safe manner via sampler or shared_epoch
     dataloader = data['train'].dataloader
+
+    text_embed_table = data['train'].text_embed_table
+    if text_embed_table is not None:
+        # the whole caption-embedding table lives on-device; batches carry row indices only
+        text_embed_table = text_embed_table.to(device)
     num_batches_per_epoch = dataloader.num_batches // args.accum_freq
     sample_digits = math.ceil(math.log(dataloader.num_samples + 1, 10))
 
     if args.accum_freq > 1:
-        accum_images, accum_texts, accum_features = [], [], {}
+        # SoA cache for the accumulation window: one contiguous (accum_freq, B, ...) tensor
+        # per input / feature key, allocated lazily once shapes are known and reused across
+        # windows -- no Python list churn in the hot path
+        accum_images = accum_texts = None
+        accum_features = {}
+
+    # the dataloader returns pinned TrainBatches of preprocessed images and texts (tokens (CLIP)
+    # or embeddings (LIFT)); on CUDA the prefetcher overlaps the H2D copies with compute
+    if device.type == 'cuda':
+        batch_iter = CUDAPrefetcher(dataloader, device, input_dtype)
+    else:
+        batch_iter = (during_training_data_preprocess(batch, device, input_dtype) for batch in dataloader)
+
+    # hoist the per-step module unwrap / attribute walk and the log constant out of the hot loop
+    raw_model = unwrap_model(model)
+    has_logit_scale = hasattr(raw_model, 'logit_scale')
+    ln_100 = math.log(100.0)
+    lift_clip = 'LIFT' in args.model
+    # cache trainable params once for gradient clipping instead of re-walking model.parameters()
+    grad_params = [p for p in model.parameters() if p.requires_grad]
+
+    # DDP capture needs NCCL >= 2.9.6 plus ~11 warmed-up DDP iterations before the allreduce
+    # hooks settle; torch.compile with max-autotune already uses inductor's own CUDA graphs,
+    # and TE fp8 does host-side amax bookkeeping each step -- none of these can sit inside a
+    # plain capture, so run eagerly for all of them
+    use_cuda_graph = (
+        args.cuda_graph and device.type == 'cuda' and args.accum_freq == 1
+        and not args.distill and scaler is None and not args.horovod
+        and not args.distributed and not args.torchcompile and args.precision != 'fp8'
+    )
+    if args.cuda_graph and not use_cuda_graph:
+        logging.warning(
+            '--cuda-graph requested but unsupported with the current settings '
+            '(needs CUDA, accum_freq == 1, no distillation, no grad scaler, no horovod, '
+            'no DDP, no torchcompile, no fp8); running eagerly.')
+    if use_cuda_graph and args.precision in ('amp_bfloat16', 'amp_bf16'):
+        # autocast regions captured in a CUDA graph must run with the autocast cache disabled
+        graph_autocast = lambda: torch.amp.autocast(dtype=torch.bfloat16, device_type='cuda', cache_enabled=False)
+    else:
+        graph_autocast = autocast
+    graph_step = CUDAGraphStep(model, loss, graph_autocast, fp8_forward) if use_cuda_graph else None
 
+    master = is_master(args)
     losses_m = {}
+    running_losses = {} # on-device loss accumulators; synced to host only on log steps
+    running_count = 0
+    capitalized_names = {} # cached "Loss_name" / "train/loss_name" strings for the log block
+    train_log_keys = {}
     batch_time_m = AverageMeter()
     data_time_m = AverageMeter()
-    end = time.time()
-    for i, batch in enumerate(dataloader):
+    end = time.perf_counter() # perf_counter is monotonic and cheaper than time.time
+    for i, (images, texts) in enumerate(batch_iter):
+        if text_embed_table is not None:
+            # gather this batch's caption embeddings from the on-device table by row index
+            texts = text_embed_table.index_select(0, texts)
+
         i_accum = i // args.accum_freq
         step = num_batches_per_epoch * epoch + i_accum
 
         if not args.skip_scheduler:
             scheduler(step)
 
-        tuple_images, tuple_texts = batch # the dataloader returns a tuple of unpreprocessed images and texts (either str (CLIP) or numpy array (LIFT))
-        images, texts = during_training_data_preprocess(tuple_images, tuple_texts, preprocess, args, tokenizer, device)
-      
-        data_time_m.update(time.time() - end)
-        optimizer.zero_grad()
+        data_time_m.update(time.perf_counter() - end)
+        # set_to_none avoids a full-parameter grad memset per step; graph replays accumulate
+        # into static grad buffers, which therefore must be zeroed rather than freed
+        optimizer.zero_grad(set_to_none=graph_step is None)
 
-        if args.accum_freq == 1:
+        if graph_step is not None:
+            losses, logit_scale = graph_step.step(images, texts, optimizer)
+
+            # clip the gradients for LIFT
+            if lift_clip:
+                torch.nn.utils.clip_grad_norm_(grad_params, 1, foreach=True)
+        elif args.accum_freq == 1:
             with autocast():
-                model_out = model(images, text=texts)
+                if args.distill:
+                    # launch the frozen bf16 teacher first, on its own stream, so its kernels
+                    # overlap with the student forward on the main stream; inference_mode is
+                    # cheaper than no_grad (no view/version tracking)
+                    teacher_images = images.to(torch.bfloat16)
+                    if dist_stream is not None:
+                        dist_stream.wait_stream(torch.cuda.current_stream())
+                        with torch.cuda.stream(dist_stream), torch.inference_mode():
+                            dist_model_out = dist_model(teacher_images, texts)
+                    else:
+                        with torch.inference_mode():
+                            dist_model_out = dist_model(teacher_images, texts)
+
+                with fp8_forward():
+                    model_out = model(images, text=texts)
                 logit_scale = model_out["logit_scale"] if 'logit_scale' in model_out else None
                 if args.distill:
-                    with torch.no_grad():
-                        dist_model_out = dist_model(images, texts)
-                    model_out.update({f'dist_{k}': v for k, v in dist_model_out.items()})
+                    if dist_stream is not None:
+                        torch.cuda.current_stream().wait_stream(dist_stream)
+                    # clone out of inference_mode so the teacher outputs can feed autograd-recorded loss ops
+                    model_out.update({f'dist_{k}': v.clone() for k, v in dist_model_out.items()})
                 losses = loss(**model_out, output_dict=True)
 
-                total_loss = sum(losses.values())
+                total_loss = sum_losses(losses)
                 losses["loss"] = total_loss
 
             backward(total_loss, scaler)
 
             # clip the gradients for LIFT
-            if 'LIFT' in args.model:
-                torch.nn.utils.clip_grad_norm_(model.parameters(), 1)
+            if lift_clip:
+                torch.nn.utils.clip_grad_norm_(grad_params, 1, foreach=True)
         else:
-            # First, cache the features without any gradient tracking.
-            with torch.no_grad():
+            # First, cache the features without any gradient tracking; inference_mode is
+            # cheaper than no_grad since it disables view and version-counter tracking.
+            with torch.inference_mode():
                 with autocast():
-                    model_out = model(images, text=texts)
+                    with fp8_forward():
+                        model_out = model(images, text=texts)
 
                     for f in ("logit_scale", "logit_bias"):
                         model_out.pop(f, None)
 
-                    for key, val in model_out.items():
-                        if key in accum_features:
-                            accum_features[key].append(val)
-                        else:
-                            accum_features[key] = [val]
-
-                accum_images.append(images)
-                accum_texts.append(texts)
+            # Features for the whole accumulation window live in one contiguous buffer per
+            # key, written row by row; the buffers are reused across windows. Copying
+            # happens outside inference_mode so the buffers stay usable in autograd ops.
+            with torch.no_grad():
+                j = i % args.accum_freq
+                for key, val in model_out.items():
+                    if key not in accum_features:
+                        accum_features[key] = val.new_empty((args.accum_freq,) + val.shape)
+                    accum_features[key][j].copy_(val)
+
+                if accum_images is None:
+                    accum_images = images.new_empty((args.accum_freq,) + images.shape)
+                    accum_texts = texts.new_empty((args.accum_freq,) + texts.shape)
+                accum_images[j].copy_(images)
+                accum_texts[j].copy_(texts)
 
             # If (i + 1) % accum_freq is not zero, move on to the next batch.
             if ((i + 1) % args.accum_freq) > 0:
@@ -169,80 +425,110 @@ def train_one_epoch(
             # Now, ready to take gradients for the last accum_freq batches.
             # Re-do the forward pass for those batches, and use the cached features from the other batches as negatives.
             # Call backwards each time, but only step optimizer at the end.
-            optimizer.zero_grad()
+            # No extra zero_grad needed here: grads were never populated during the no-grad caching passes.
             for j in range(args.accum_freq):
                 images = accum_images[j]
                 texts = accum_texts[j]
-                with autocast():
-                    model_out = model(images, texts)
-
-                    inputs_no_accum = {}
-                    inputs_no_accum["logit_scale"] = logit_scale = model_out.pop("logit_scale")
-                    if "logit_bias" in model_out:
-                        inputs_no_accum["logit_bias"] = model_out.pop("logit_bias")
-
-                    inputs = {}
-                    for key, val in accum_features.items():
-                        accumulated = accum_features[key]
-                        inputs[key] = torch.cat(accumulated[:j] + [model_out[key]] + accumulated[j + 1:])
-
-                    losses = loss(**inputs, **inputs_no_accum, output_dict=True)
-                    del inputs
-                    del inputs_no_accum
-                    total_loss = sum(losses.values())
-                    losses["loss"] = total_loss
-
-                backward(total_loss, scaler)
+                rows = slice(j * images.shape[0], (j + 1) * images.shape[0])
+                # suppress the DDP allreduce on all but the last microbatch; gradients only
+                # need to be synchronized once per optimizer step. DDP arms its backward
+                # hooks at forward time, so no_sync has to wrap the forward pass as well.
+                last_microbatch = j == args.accum_freq - 1
+                sync_ctx = nullcontext() if (last_microbatch or not hasattr(model, 'no_sync')) else model.no_sync()
+                with sync_ctx:
+                    with autocast():
+                        with fp8_forward():
+                            model_out = model(images, texts)
+
+                        inputs_no_accum = {}
+                        inputs_no_accum["logit_scale"] = logit_scale = model_out.pop("logit_scale")
+                        if "logit_bias" in model_out:
+                            inputs_no_accum["logit_bias"] = model_out.pop("logit_bias")
+
+                        # Splice the gradient-carrying microbatch features into their row slice of
+                        # the cached window buffer instead of rebuilding the window with
+                        # O(accum_freq) torch.cat calls (and allocations) per microbatch.
+                        inputs = {}
+                        cached_rows = {}
+                        for key, feat_buf in accum_features.items():
+                            cached_rows[key] = feat_buf[j].clone()
+                            spliced = feat_buf.detach().flatten(0, 1) # fresh autograd graph for each microbatch
+                            spliced[rows] = model_out[key]
+                            inputs[key] = spliced
+
+                        losses = loss(**inputs, **inputs_no_accum, output_dict=True)
+                        del inputs
+                        del inputs_no_accum
+                        total_loss = sum_losses(losses)
+                        losses["loss"] = total_loss
+
+                    backward(total_loss, scaler)
+
+                # restore the cached features, so later microbatches see the same negatives
+                with torch.no_grad():
+                    for key, feat_buf in accum_features.items():
+                        feat_buf[j].copy_(cached_rows[key])
 
         if scaler is not None:
             if args.horovod:
                 optimizer.synchronize()
                 scaler.unscale_(optimizer)
                 if args.grad_clip_norm is not None:
-                    torch.nn.utils.clip_grad_norm_(model.parameters(), args.grad_clip_norm, norm_type=2.0)
+                    torch.nn.utils.clip_grad_norm_(grad_params, args.grad_clip_norm, norm_type=2.0, foreach=True)
                 with optimizer.skip_synchronize():
                     scaler.step(optimizer)
             else:
                 if args.grad_clip_norm is not None:
                     scaler.unscale_(optimizer)
-                    torch.nn.utils.clip_grad_norm_(model.parameters(), args.grad_clip_norm, norm_type=2.0)
+                    torch.nn.utils.clip_grad_norm_(grad_params, args.grad_clip_norm, norm_type=2.0, foreach=True)
                 scaler.step(optimizer)
             scaler.update()
         else:
             if args.grad_clip_norm is not None:
-                torch.nn.utils.clip_grad_norm_(model.parameters(), args.grad_clip_norm, norm_type=2.0)
+                torch.nn.utils.clip_grad_norm_(grad_params, args.grad_clip_norm, norm_type=2.0, foreach=True)
             optimizer.step()
 
-        # reset gradient accum, if enabled
-        if args.accum_freq > 1:
-            accum_images, accum_texts, accum_features = [], [], {}
+        # (no gradient-accum reset needed: the window buffers are overwritten in place)
 
         # Note: we clamp to 4.6052 = ln(100), as in the original paper.
-        with torch.no_grad():
-            if hasattr(unwrap_model(model), 'logit_scale'):
-                unwrap_model(model).logit_scale.clamp_(0, math.log(100))
+        # Clamping .data directly skips the no_grad context manager on the critical path.
+        if has_logit_scale:
+            raw_model.logit_scale.data.clamp_(0, ln_100)
 
-        batch_time_m.update(time.time() - end)
-        end = time.time()
+        if master:
+            # accumulate loss terms on-device; a .item() here would be a full stream sync per step
+            for key, val in losses.items():
+                if key not in running_losses:
+                    running_losses[key] = torch.zeros_like(val)
+                running_losses[key] += val.detach()
+            running_count += 1
+
+        now = time.perf_counter() # read the clock once for both the update and the next step's start
+        batch_time_m.update(now - end)
+        end = now
         batch_count = i_accum + 1
-        if is_master(args) and (i_accum % args.log_every_n_steps == 0 or batch_count == num_batches_per_epoch):
+        if master and (i_accum % args.log_every_n_steps == 0 or batch_count == num_batches_per_epoch):
             batch_size = len(images)
             num_samples = batch_count * batch_size * args.accum_freq * args.world_size
             samples_per_epoch = dataloader.num_samples
             percent_complete = 100.0 * batch_count / num_batches_per_epoch
 
-            # NOTE loss is coarsely sampled, just master node and per log update
-            for key, val in losses.items():
+            # NOTE losses are averaged on-device since the last log step; a single stacked
+            # .tolist() pays one device->host sync for all loss terms instead of one per key
+            loss_vals = torch.stack(list(running_losses.values())).div_(running_count).tolist()
+            for key, avg_val in zip(running_losses, loss_vals):
                 if key not in losses_m:
                     losses_m[key] = AverageMeter()
-                losses_m[key].update(val.item(), batch_size)
+                    capitalized_names[key] = key.capitalize()
+                losses_m[key].update(avg_val, batch_size)
+            for val in running_losses.values():
+                val.zero_()
+            running_count = 0
 
-            logit_scale_scalar = logit_scale.item() if logit_scale else None
+            logit_scale_scalar = logit_scale.item() if logit_scale is not None else None
             loss_log = " ".join(
-                [
-                    f"{loss_name.capitalize()}: {loss_m.val:#.5g} ({loss_m.avg:#.5g})" 
-                    for loss_name, loss_m in losses_m.items()
-                ]
+                f"{capitalized_names[loss_name]}: {loss_m.val:#.5g} ({loss_m.avg:#.5g})"
+                for loss_name, loss_m in losses_m.items()
             )
             samples_per_second = args.accum_freq * args.batch_size * args.world_size / batch_time_m.val
             samples_per_second_per_gpu = args.accum_freq * args.batch_size / batch_time_m.val
@@ -268,7 +554,10 @@ def train_one_epoch(
             if logit_scale_scalar is not None:
                 log_data["scale"] = logit_scale_scalar            
             log_data.update({name:val.val for name,val in losses_m.items()})
-            log_data = {"train/" + name: val for name, val in log_data.items()}
+            for name in log_data:
+                if name not in train_log_keys:
+                    train_log_keys[name] = "train/" + name
+            log_data = {train_log_keys[name]: val for name, val in log_data.items()}
 
             if tb_writer is not None:
                 for name, val in log_data.items():
@@ -297,14 +586,16 @@ def train_one_epoch(
             if scaler is not None:
                 checkpoint_dict["scaler"] = scaler.state_dict()
 
-            torch.save(
+            previous_checkpoint = None
+            if args.delete_prev_step_ckpt:
+                previous_checkpoint = os.path.join(args.checkpoint_path, f"step_{completed_step - args.save_every_n_steps}.pt")
+
+            # snapshot to pinned host buffers and write on a background thread, so the
+            # training loop pays only the copy time, not the disk write
+            _ckpt_saver.save(
                 checkpoint_dict,
                 os.path.join(args.checkpoint_path, f"step_{completed_step}.pt"),
+                delete_path=previous_checkpoint,
             )
 
-            if args.delete_prev_step_ckpt:
-                previous_checkpoint = os.path.join(args.checkpoint_path, f"step_{completed_step - args.save_every_n_steps}.pt")
-                if os.path.exists(previous_checkpoint):
-                    os.remove(previous_checkpoint)
-
     # end for
\ No newline at end of file